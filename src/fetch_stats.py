@@ -7,12 +7,24 @@
 import csv
 import json
 import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import UTC, datetime
+from functools import partial
 from pathlib import Path
-from typing import Any
+from typing import TYPE_CHECKING, Any
 
 from googleapiclient.discovery import Resource, build
 from googleapiclient.errors import HttpError
+from googleapiclient.http import build_http
+
+if TYPE_CHECKING:
+    import httplib2
+
+MAX_WORKERS = 8
+MAX_IDS_PER_REQUEST = 50
+
+_thread_local = threading.local()
 
 
 def get_api_key() -> str:
@@ -63,7 +75,7 @@ def get_channel_id_from_handle(youtube: Resource, handle: str) -> str | None:
             part='id',
             forHandle=handle_clean,
         )
-        response: dict[str, Any] = request.execute()
+        response: dict[str, Any] = request.execute(http=get_http())
 
         if response.get('items'):
             channel_id: str = response['items'][0]['id']
@@ -76,32 +88,38 @@ def get_channel_id_from_handle(youtube: Resource, handle: str) -> str | None:
         return None
 
 
-def get_channel_stats(youtube: Resource, channel_id: str) -> dict[str, int | str | bool] | None:
-    """チャンネルIDから統計情報を取得する.
+def get_channel_stats_bulk(youtube: Resource, channel_ids: list[str]) -> dict[str, dict[str, int | str | bool]]:
+    """複数のチャンネルIDから統計情報をまとめて取得する.
+
+    channels.list は1リクエストで最大50件のIDを受け付けるため、呼び出し側で50件ずつに分割して渡すこと.
 
     Args:
         youtube: YouTube API クライアント
-        channel_id: YouTubeチャンネルID
+        channel_ids: YouTubeチャンネルIDのリスト (最大50件)
 
     Returns:
-        統計情報の辞書 または None
+        チャンネルIDをキーとした統計情報の辞書 (取得できなかったIDは含まない)
     """
     try:
         request = youtube.channels().list(
             part='statistics,snippet',
-            id=channel_id,
+            id=','.join(channel_ids),
+            maxResults=MAX_IDS_PER_REQUEST,
         )
-        response: dict[str, Any] = request.execute()
+        response: dict[str, Any] = request.execute(http=get_http())
 
-        if not response.get('items'):
-            print(f'チャンネルが見つからない: {channel_id}')
-            return None
+    except HttpError as e:
+        print(f'統計情報取得エラー ({",".join(channel_ids)}): {e}')
+        return {}
+
+    result: dict[str, dict[str, int | str | bool]] = {}
 
-        item: dict[str, Any] = response['items'][0]
+    for item in response.get('items', []):
+        channel_id: str = item['id']
         stats: dict[str, Any] = item['statistics']
         snippet: dict[str, Any] = item['snippet']
 
-        return {
+        result[channel_id] = {
             'channel_id': channel_id,
             'channel_name': snippet.get('title', ''),
             'subscriber_count': int(stats.get('subscriberCount', 0)),
@@ -110,44 +128,84 @@ def get_channel_stats(youtube: Resource, channel_id: str) -> dict[str, int | str
             'hidden_subscriber_count': stats.get('hiddenSubscriberCount', False),
         }
 
-    except HttpError as e:
-        print(f'統計情報取得エラー ({channel_id}): {e}')
-        return None
+    for channel_id in channel_ids:
+        if channel_id not in result:
+            print(f'チャンネルが見つからない: {channel_id}')
 
+    return result
 
-def save_to_csv(data: dict[str, int | str | bool], output_dir: Path) -> None:
-    """統計データをCSVファイルに追記する.
 
-    チャンネルごとに別ファイルで管理する.
+def get_http() -> 'httplib2.Http':
+    """スレッドごとのHTTP接続を取得する.
+
+    httplib2.Http はスレッドセーフではないため、googleapiclient と同じ設定 (タイムアウト・リダイレクト) の
+    build_http でスレッドごとに生成して使い回す.
+    同じインスタンスを使い続けることで、リクエスト間でTCP/TLS接続が再利用される.
+
+    Returns:
+        HTTP接続オブジェクト
+    """
+    http: httplib2.Http | None = getattr(_thread_local, 'http', None)
+    if http is None:
+        http = build_http()
+        _thread_local.http = http
+    return http
+
+
+def resolve_channel_id(youtube: Resource, channel_config: dict[str, Any]) -> str | None:
+    """チャンネル設定のハンドル名からチャンネルIDを解決する.
+
+    forHandle は1件ずつしか指定できないため、スレッドプールから並列に呼び出す.
 
     Args:
-        data: 統計データ
-        output_dir: 出力ディレクトリ
+        youtube: YouTube API クライアント
+        channel_config: チャンネル設定
+
+    Returns:
+        チャンネルID または None
     """
-    filename = f'{data["channel_id"]}.csv'
-    filepath = output_dir / filename
+    handle: str = channel_config.get('handle', '')
+    return get_channel_id_from_handle(youtube, handle)
 
-    timestamp = datetime.now(UTC).strftime('%Y-%m-%d %H:%M:%S')
 
-    row = {
-        'timestamp': timestamp,
-        'subscriber_count': data['subscriber_count'],
-        'view_count': data['view_count'],
-        'video_count': data['video_count'],
-    }
+CSV_FIELDNAMES = ('timestamp', 'subscriber_count', 'view_count', 'video_count')
+
+CsvRow = tuple[str, int, int, int]
+
+
+def make_csv_row(data: dict[str, int | str | bool], timestamp: str) -> CsvRow:
+    """統計データをCSVの1行分のタプルに変換する.
+
+    Args:
+        data: 統計データ
+        timestamp: 記録時刻の文字列
+
+    Returns:
+        CSV_FIELDNAMES の順に並べたタプル
+    """
+    return (timestamp, int(data['subscriber_count']), int(data['view_count']), int(data['video_count']))
 
-    file_exists = filepath.exists()
 
-    with open(filepath, 'a', newline='', encoding='utf-8') as f:
-        fieldnames = ['timestamp', 'subscriber_count', 'view_count', 'video_count']
-        writer = csv.DictWriter(f, fieldnames=fieldnames)
+def save_to_csv(rows_by_path: dict[Path, list[CsvRow]]) -> None:
+    """統計データの行をCSVファイルに追記する.
 
-        if not file_exists:
-            writer.writeheader()
+    チャンネルごとに別ファイルで管理し、各ファイルは1回だけ開いて csv.writer でまとめて書き込む.
+    存在確認はせず、まず新規作成('x'モード)を試みて、既存ファイルなら追記で開き直す.
 
-        writer.writerow(row)
+    Args:
+        rows_by_path: 出力ファイルのパスごとの行リスト
+    """
+    for filepath, rows in rows_by_path.items():
+        try:
+            with open(filepath, 'x', buffering=1 << 16, newline='', encoding='utf-8') as f:
+                writer = csv.writer(f)
+                writer.writerow(CSV_FIELDNAMES)
+                writer.writerows(rows)
+        except FileExistsError:
+            with open(filepath, 'a', buffering=1 << 16, newline='', encoding='utf-8') as f:
+                csv.writer(f).writerows(rows)
 
-    print(f'保存完了: {filepath}')
+        print(f'保存完了: {filepath}')
 
 
 def main() -> None:
@@ -160,6 +218,7 @@ def main() -> None:
     data_dir.mkdir(exist_ok=True)
 
     api_key = get_api_key()
+    # クライアントの生成(ディスカバリ文書の解析)は1度だけ行い、各スレッドはリクエスト実行時に自身のHTTP接続を渡す
     youtube: Resource = build('youtube', 'v3', developerKey=api_key)
 
     channels = load_channels_config(config_path)
@@ -171,21 +230,33 @@ def main() -> None:
     print(f'対象チャンネル数: {len(channels)}')
     print('-' * 50)
 
-    for channel_config in channels:
+    timestamp = datetime.now(UTC).strftime('%Y-%m-%d %H:%M:%S')
+    rows_by_path: dict[Path, list[CsvRow]] = {}
+
+    # ハンドル名の解決はネットワーク待ちが支配的なため並列に実行し、結果は設定順に出力する
+    with ThreadPoolExecutor(max_workers=min(MAX_WORKERS, len(channels))) as executor:
+        channel_ids = list(executor.map(partial(resolve_channel_id, youtube), channels))
+
+    # 統計情報は50件ずつまとめて取得する
+    unique_ids = list(dict.fromkeys(cid for cid in channel_ids if cid))
+    stats_by_id: dict[str, dict[str, int | str | bool]] = {}
+
+    for start in range(0, len(unique_ids), MAX_IDS_PER_REQUEST):
+        stats_by_id.update(get_channel_stats_bulk(youtube, unique_ids[start : start + MAX_IDS_PER_REQUEST]))
+
+    for channel_config, channel_id in zip(channels, channel_ids, strict=True):
         handle: str = channel_config.get('handle', '')
         name: str = channel_config.get('name', handle)
 
         print(f'\n処理中: {name} ({handle})')
 
-        channel_id = get_channel_id_from_handle(youtube, handle)
-
         if not channel_id:
             print('  -> チャンネルIDの取得に失敗した')
             continue
 
         print(f'  -> チャンネルID: {channel_id}')
 
-        stats = get_channel_stats(youtube, channel_id)
+        stats = stats_by_id.get(channel_id)
 
         if not stats:
             print('  -> 統計情報の取得に失敗した')
@@ -195,9 +266,11 @@ def main() -> None:
         print(f'  -> 総視聴回数: {stats["view_count"]:,}')
         print(f'  -> 動画数: {stats["video_count"]:,}')
 
-        save_to_csv(stats, data_dir)
+        filepath = data_dir / f'{stats["channel_id"]}.csv'
+        rows_by_path.setdefault(filepath, []).append(make_csv_row(stats, timestamp))
 
     print('\n' + '-' * 50)
+    save_to_csv(rows_by_path)
     print('処理完了')
 
 
@@ -4,80 +4,142 @@
 CSVデータを読み込み、登録者数・視聴回数・動画数の推移グラフをPNG画像として出力する.
 """
 
-import csv
-from datetime import datetime
+import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import cache, partial
 from pathlib import Path
-from typing import Any
 
+import matplotlib
 import matplotlib.dates as mdates
-import matplotlib.pyplot as plt
+import pandas as pd
+from matplotlib.axes import Axes
+from matplotlib.figure import Figure
+from matplotlib.lines import Line2D
+from matplotlib.ticker import FuncFormatter
 
+from storage import load_stats_frame
 
-def load_csv_data(csv_path: Path) -> dict[str, list[Any]]:
+PLOT_COLUMNS = ['subscriber_count', 'view_count', 'video_count']
+
+# 密な系列では見た目が変わらない範囲で線分を間引いて描画する
+matplotlib.rcParams['path.simplify'] = True
+matplotlib.rcParams['path.simplify_threshold'] = 1.0
+
+
+def load_csv_data(csv_path: Path) -> pd.DataFrame:
     """CSVファイルからデータを読み込む.
 
+    fetch_stats.py が書き出した同名のParquetファイルがCSVと一致していれば、CSVの代わりにそちらを読み込む.
+
     Args:
         csv_path: CSVファイルのパス
 
     Returns:
-        各カラムのデータを格納した辞書
+        各カラムのデータを格納したDataFrame
     """
-    data: dict[str, list[Any]] = {
-        'timestamp': [],
-        'subscriber_count': [],
-        'view_count': [],
-        'video_count': [],
-    }
+    return load_stats_frame(csv_path)
 
-    with open(csv_path, encoding='utf-8') as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            data['timestamp'].append(datetime.strptime(row['timestamp'], '%Y-%m-%d %H:%M:%S'))
-            data['subscriber_count'].append(int(row['subscriber_count']))
-            data['view_count'].append(int(row['view_count']))
-            data['video_count'].append(int(row['video_count']))
 
-    return data
+@cache
+def create_figure() -> tuple[Figure, list[Axes], list[Line2D]]:
+    """グラフ描画用のFigureを作成する.
 
+    pyplotを介さずAggで描画するFigureを直接生成する.
+    軸・目盛り・レイアウトの設定はプロセスごとに1度だけ行い、チャンネルごとにはデータだけを差し替えて使い回す.
 
-def generate_graph(data: dict[str, list[Any]], output_path: Path, channel_name: str) -> None:
-    """グラフ画像を生成する.
-
-    Args:
-        data: CSVから読み込んだデータ
-        output_path: 出力画像のパス
-        channel_name: グラフタイトルに表示するチャンネル名
+    Returns:
+        Figure と各指標の Axes・Line2D のリスト (いずれも PLOT_COLUMNS の順)
     """
-    fig, axes = plt.subplots(3, 1, figsize=(10, 8), sharex=True)
-    fig.suptitle(f'{channel_name} - Statistics', fontsize=14)
+    fig = Figure(figsize=(10, 8), layout='constrained')
+    axes = fig.subplots(3, 1, sharex=True)
 
-    timestamps = data['timestamp']
+    for ax in axes:
+        ax.xaxis_date()
 
     # 登録者数
-    axes[0].plot(timestamps, data['subscriber_count'], marker='o', markersize=3, color='#e74c3c')
+    (subscriber_line,) = axes[0].plot([], [], marker='o', markersize=3, color='#e74c3c')
     axes[0].set_ylabel('Subscribers')
     axes[0].grid(True, alpha=0.3)
-    axes[0].yaxis.set_major_formatter(plt.FuncFormatter(lambda x, p: format(int(x), ',')))
+    axes[0].yaxis.set_major_formatter(FuncFormatter(lambda x, p: format(int(x), ',')))
 
     # 視聴回数
-    axes[1].plot(timestamps, data['view_count'], marker='o', markersize=3, color='#3498db')
+    (view_line,) = axes[1].plot([], [], marker='o', markersize=3, color='#3498db')
     axes[1].set_ylabel('Views')
     axes[1].grid(True, alpha=0.3)
-    axes[1].yaxis.set_major_formatter(plt.FuncFormatter(lambda x, p: format(int(x), ',')))
+    axes[1].yaxis.set_major_formatter(FuncFormatter(lambda x, p: format(int(x), ',')))
 
     # 動画数
-    axes[2].plot(timestamps, data['video_count'], marker='o', markersize=3, color='#2ecc71')
+    (video_line,) = axes[2].plot([], [], marker='o', markersize=3, color='#2ecc71')
     axes[2].set_ylabel('Videos')
     axes[2].grid(True, alpha=0.3)
     axes[2].xaxis.set_major_formatter(mdates.DateFormatter('%m/%d'))
     axes[2].xaxis.set_major_locator(mdates.AutoDateLocator())
+    axes[2].tick_params(axis='x', labelrotation=45)
+
+    return fig, list(axes), [subscriber_line, view_line, video_line]
 
-    plt.xticks(rotation=45)
-    plt.tight_layout()
-    plt.savefig(output_path, dpi=150, bbox_inches='tight')
-    plt.close()
 
-    print(f'グラフ保存完了: {output_path}')
+def generate_graph(fig: Figure, axes: list[Axes], lines: list[Line2D], data: pd.DataFrame, output_path: Path, channel_name: str) -> None:
+    """グラフ画像を生成する.
+
+    Args:
+        fig: create_figure で作成したFigure
+        axes: create_figure で作成した各指標の Axes
+        lines: create_figure で作成した各指標の Line2D
+        data: CSVから読み込んだデータ
+        output_path: 出力画像のパス
+        channel_name: グラフタイトルに表示するチャンネル名
+    """
+    fig.suptitle(f'{channel_name} - Statistics', fontsize=14)
+
+    timestamps = data['timestamp'].to_numpy()
+
+    for ax, line, column in zip(axes, lines, PLOT_COLUMNS, strict=True):
+        line.set_data(timestamps, data[column].to_numpy())
+        ax.relim()
+        ax.autoscale_view()
+
+    fig.savefig(output_path, dpi=100)
+
+
+def is_graph_up_to_date(csv_path: Path, graphs_dir: Path) -> bool:
+    """CSVファイルに対応するグラフ画像がCSVファイルより新しいか判定する.
+
+    Args:
+        csv_path: CSVファイルのパス
+        graphs_dir: グラフ画像の出力ディレクトリ
+
+    Returns:
+        グラフ画像が存在し、CSVファイルより新しい場合は True
+    """
+    output_path = graphs_dir / f'{csv_path.stem}.png'
+    return output_path.exists() and output_path.stat().st_mtime_ns > csv_path.stat().st_mtime_ns
+
+
+def render_one(csv_path: Path, graphs_dir: Path) -> str:
+    """1つのCSVファイルからグラフ画像を生成する.
+
+    プロセスプールのワーカーでも実行されるため、出力はせず結果のメッセージを返す.
+
+    Args:
+        csv_path: CSVファイルのパス
+        graphs_dir: グラフ画像の出力ディレクトリ
+
+    Returns:
+        処理結果のメッセージ
+    """
+    channel_id = csv_path.stem
+    output_path = graphs_dir / f'{channel_id}.png'
+
+    data = load_csv_data(csv_path)
+
+    if len(data) < 2:
+        return '  -> データが2件未満のためスキップ'
+
+    fig, axes, lines = create_figure()
+    generate_graph(fig, axes, lines, data, output_path, channel_id)
+
+    return f'グラフ保存完了: {output_path}'
 
 
 def main() -> None:
@@ -98,19 +160,20 @@ def main() -> None:
     print(f'処理対象: {len(csv_files)} ファイル')
     print('-' * 50)
 
-    for csv_path in csv_files:
-        print(f'\n処理中: {csv_path.name}')
-
-        data = load_csv_data(csv_path)
+    stale_files = [csv_path for csv_path in csv_files if not is_graph_up_to_date(csv_path, graphs_dir)]
+    max_workers = min(len(stale_files), os.cpu_count() or 1)
 
-        if len(data['timestamp']) < 2:
-            print('  -> データが2件未満のためスキップ')
-            continue
+    if max_workers > 1:
+        # グラフ描画はCPU負荷が高くFigureも共有できないため、CSVごとに別プロセスで並列に描画する
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            messages = dict(zip(stale_files, executor.map(partial(render_one, graphs_dir=graphs_dir), stale_files), strict=True))
+    else:
+        # 描画対象が1件以下ならプロセスの起動コストの方が大きいため、このプロセスで描画する
+        messages = {csv_path: render_one(csv_path, graphs_dir) for csv_path in stale_files}
 
-        channel_id = csv_path.stem
-        output_path = graphs_dir / f'{channel_id}.png'
-
-        generate_graph(data, output_path, channel_id)
+    for csv_path in csv_files:
+        print(f'\n処理中: {csv_path.name}')
+        print(messages.get(csv_path, '  -> グラフがCSVより新しいためスキップ'))
 
     print('\n' + '-' * 50)
     print('処理完了')
@@ -8,24 +8,36 @@ CSVデータを読み込み、期間フィルタや前日比・前週比を確
     uv run streamlit run src/interactive_graph.py
 """
 
-import csv
-from dataclasses import dataclass, field
+from dataclasses import dataclass
 from datetime import datetime, timedelta
 from pathlib import Path
 
+import numpy as np
+import numpy.typing as npt
 import plotly.graph_objects as go
 import streamlit as st
 from plotly.subplots import make_subplots
 
+from storage import load_stats_frame
+
+# 表示期間の選択肢
+PERIOD_OPTIONS = ['全期間', '過去7日', '過去30日', '過去90日']
+
+# グラフに描画する最大点数 (これを超える場合は間引いて描画する)
+MAX_PLOT_POINTS = 2000
+
 
 @dataclass
 class ChannelData:
-    """チャンネルデータを格納するクラス."""
+    """チャンネルデータを格納するクラス.
 
-    timestamp: list[datetime] = field(default_factory=list)
-    subscriber_count: list[int] = field(default_factory=list)
-    view_count: list[int] = field(default_factory=list)
-    video_count: list[int] = field(default_factory=list)
+    各カラムは型付きのnumpy配列で保持する (タイムスタンプは datetime64[s]、数値は int64).
+    """
+
+    timestamp: npt.NDArray[np.datetime64]
+    subscriber_count: npt.NDArray[np.int64]
+    view_count: npt.NDArray[np.int64]
+    video_count: npt.NDArray[np.int64]
 
 
 @dataclass
@@ -46,43 +58,75 @@ st.set_page_config(
 )
 
 
+FileSignature = tuple[str, int, int]
+
+
+def file_signature(path: Path) -> FileSignature:
+    """キャッシュキーとして使うファイルの識別情報を返す.
+
+    キャッシュ対象の関数にはこの値を明示的な引数として渡す.
+    パスだけでなく更新時刻とサイズも含めることで、ファイルが更新されたときにキャッシュを無効化する.
+
+    Args:
+        path: ファイルのパス
+
+    Returns:
+        パス文字列・更新時刻(ナノ秒)・サイズのタプル
+    """
+    stat = path.stat()
+    return str(path), stat.st_mtime_ns, stat.st_size
+
+
 @st.cache_data
-def load_csv_data(csv_path: Path) -> ChannelData:
+def load_csv_data(csv_path: Path, signature: FileSignature) -> ChannelData:
     """CSVファイルからデータを読み込む.
 
+    fetch_stats.py が書き出した同名のParquetファイルがCSVと一致していれば、CSVの代わりにそちらを読み込む.
+
     Args:
         csv_path: CSVファイルのパス
+        signature: キャッシュキーとするファイルの識別情報 (file_signature の値)
 
     Returns:
         チャンネルデータ
     """
-    data = ChannelData()
+    df = load_stats_frame(csv_path)
 
-    with open(csv_path, encoding='utf-8') as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            data.timestamp.append(datetime.strptime(row['timestamp'], '%Y-%m-%d %H:%M:%S'))
-            data.subscriber_count.append(int(row['subscriber_count']))
-            data.view_count.append(int(row['view_count']))
-            data.video_count.append(int(row['video_count']))
+    return ChannelData(
+        timestamp=df['timestamp'].to_numpy(dtype='datetime64[s]'),
+        subscriber_count=df['subscriber_count'].to_numpy(dtype=np.int64),
+        view_count=df['view_count'].to_numpy(dtype=np.int64),
+        video_count=df['video_count'].to_numpy(dtype=np.int64),
+    )
 
-    return data
+
+def get_reference_time() -> datetime:
+    """期間フィルタの基準時刻を返す.
+
+    キャッシュのキーに含めるため、現在時刻を1時間単位に切り捨てる.
+
+    Returns:
+        1時間単位に切り捨てた現在時刻
+    """
+    return datetime.now().replace(minute=0, second=0, microsecond=0)
 
 
-def filter_data_by_period(data: ChannelData, period: str) -> ChannelData:
+def filter_data_by_period(data: ChannelData, period: str, reference_time: datetime) -> ChannelData:
     """指定期間でデータをフィルタする.
 
+    タイムスタンプは昇順に並んでいるため、二分探索で開始位置を求めてスライスする.
+
     Args:
         data: 元データ
         period: フィルタ期間
+        reference_time: 期間の終端とする基準時刻
 
     Returns:
         フィルタ後のデータ
     """
-    if period == '全期間' or not data.timestamp:
+    if period == '全期間' or len(data.timestamp) == 0:
         return data
 
-    now = datetime.now()
     period_days = {
         '過去7日': 7,
         '過去30日': 30,
@@ -93,73 +137,87 @@ def filter_data_by_period(data: ChannelData, period: str) -> ChannelData:
     if days == 0:
         return data
 
-    cutoff = now - timedelta(days=days)
+    cutoff = reference_time - timedelta(days=days)
 
-    filtered = ChannelData()
+    idx = int(np.searchsorted(data.timestamp, np.datetime64(cutoff, 's')))
 
-    for i, ts in enumerate(data.timestamp):
-        if ts >= cutoff:
-            filtered.timestamp.append(ts)
-            filtered.subscriber_count.append(data.subscriber_count[i])
-            filtered.view_count.append(data.view_count[i])
-            filtered.video_count.append(data.video_count[i])
+    return ChannelData(
+        timestamp=data.timestamp[idx:],
+        subscriber_count=data.subscriber_count[idx:],
+        view_count=data.view_count[idx:],
+        video_count=data.video_count[idx:],
+    )
 
-    return filtered
 
+@st.cache_data
+def precomputed_slices(csv_path: Path, signature: FileSignature, reference_time: datetime) -> dict[str, ChannelData]:
+    """全ての表示期間についてフィルタ済みのデータを作成する.
 
-def calculate_metric_change(values: list[int], offset: int) -> ChangeMetrics:
-    """指標の変化量を計算する.
+    読み込み時に1度だけ全期間分を作っておくことで、期間の切り替えはキャッシュ済みの辞書を引くだけになる.
+    基準時刻をキーに含めるため、時間の経過で期間の範囲が古くなることはない.
 
     Args:
-        values: 値のリスト
-        offset: 比較対象のオフセット (1: 前日, 7: 前週)
+        csv_path: CSVファイルのパス
+        signature: キャッシュキーとするファイルの識別情報 (file_signature の値)
+        reference_time: 期間の終端とする基準時刻 (get_reference_time の値)
 
     Returns:
-        変化量メトリクス
+        表示期間をキーとしたフィルタ後のデータ
     """
-    metrics = ChangeMetrics()
-
-    if len(values) <= offset:
-        return metrics
+    data = load_csv_data(csv_path, signature)
+    return {period: filter_data_by_period(data, period, reference_time) for period in PERIOD_OPTIONS}
 
-    current = values[-1]
-    previous = values[-(offset + 1)]
 
-    change = current - previous
-    rate = (change / previous * 100) if previous != 0 else 0.0
+def calculate_rate(change: int, previous: int) -> float:
+    """変化率(%)を計算する.
 
-    if offset == 1:
-        metrics.daily_change = change
-        metrics.daily_rate = round(rate, 2)
-    else:
-        metrics.weekly_change = change
-        metrics.weekly_rate = round(rate, 2)
+    Args:
+        change: 変化量
+        previous: 比較対象の値
 
-    return metrics
+    Returns:
+        小数第2位までの変化率 (比較対象が0の場合は 0.0)
+    """
+    return round(change / previous * 100, 2) if previous != 0 else 0.0
 
 
-def calculate_changes(data: ChannelData) -> dict[str, ChangeMetrics]:
+@st.cache_data
+def calculate_changes(csv_path: Path, signature: FileSignature) -> dict[str, ChangeMetrics]:
     """前日比・前週比を計算する.
 
     Args:
-        data: CSVから読み込んだデータ
+        csv_path: CSVファイルのパス
+        signature: キャッシュキーとするファイルの識別情報 (file_signature の値)
 
     Returns:
         各指標の変化量
     """
+    data = load_csv_data(csv_path, signature)
     result: dict[str, ChangeMetrics] = {}
 
     for key in ['subscriber_count', 'view_count', 'video_count']:
-        values: list[int] = getattr(data, key)
+        values: npt.NDArray[np.int64] = getattr(data, key)
+
+        daily_change: int | None = None
+        daily_rate: float | None = None
+        weekly_change: int | None = None
+        weekly_rate: float | None = None
+
+        if len(values) > 1:
+            previous = int(values[-2])
+            daily_change = int(values[-1]) - previous
+            daily_rate = calculate_rate(daily_change, previous)
 
-        daily = calculate_metric_change(values, 1)
-        weekly = calculate_metric_change(values, 7)
+        if len(values) > 7:
+            previous = int(values[-8])
+            weekly_change = int(values[-1]) - previous
+            weekly_rate = calculate_rate(weekly_change, previous)
 
         result[key] = ChangeMetrics(
-            daily_change=daily.daily_change,
-            daily_rate=daily.daily_rate,
-            weekly_change=weekly.weekly_change,
-            weekly_rate=weekly.weekly_rate,
+            daily_change=daily_change,
+            daily_rate=daily_rate,
+            weekly_change=weekly_change,
+            weekly_rate=weekly_rate,
         )
 
     return result
@@ -182,6 +240,32 @@ def format_change(change: int | None, rate: float | None) -> str:
     return f'{sign}{change:,} ({sign}{rate}%)'
 
 
+def downsample_data(data: ChannelData, max_points: int = MAX_PLOT_POINTS) -> ChannelData:
+    """描画用にデータを等間隔で間引く.
+
+    先頭と末尾 (最新値) の点は常に残し、その間を max_points 点になるよう均等に選ぶ.
+
+    Args:
+        data: 元データ
+        max_points: 間引き後の最大点数
+
+    Returns:
+        間引き後のデータ
+    """
+    n = len(data.timestamp)
+    if n <= max_points:
+        return data
+
+    indices = np.unique(np.linspace(0, n - 1, max_points).round().astype(np.int64))
+
+    return ChannelData(
+        timestamp=data.timestamp[indices],
+        subscriber_count=data.subscriber_count[indices],
+        view_count=data.view_count[indices],
+        video_count=data.video_count[indices],
+    )
+
+
 def create_graph(data: ChannelData, channel_name: str) -> go.Figure:
     """グラフを作成する.
 
@@ -200,10 +284,11 @@ def create_graph(data: ChannelData, channel_name: str) -> go.Figure:
         subplot_titles=('登録者数', '視聴回数', '動画数'),
     )
 
+    data = downsample_data(data)
     timestamps = data.timestamp
 
     fig.add_trace(
-        go.Scatter(
+        go.Scattergl(
             x=timestamps,
             y=data.subscriber_count,
             mode='lines+markers',
@@ -216,7 +301,7 @@ def create_graph(data: ChannelData, channel_name: str) -> go.Figure:
     )
 
     fig.add_trace(
-        go.Scatter(
+        go.Scattergl(
             x=timestamps,
             y=data.view_count,
             mode='lines+markers',
@@ -229,7 +314,7 @@ def create_graph(data: ChannelData, channel_name: str) -> go.Figure:
     )
 
     fig.add_trace(
-        go.Scatter(
+        go.Scattergl(
             x=timestamps,
             y=data.video_count,
             mode='lines+markers',
@@ -255,6 +340,91 @@ def create_graph(data: ChannelData, channel_name: str) -> go.Figure:
     return fig
 
 
+@st.cache_data
+def build_figure(csv_path: Path, signature: FileSignature, period: str, channel_id: str, reference_time: datetime) -> go.Figure:
+    """CSVファイルと表示期間からグラフを作成する.
+
+    同じファイル・期間・基準時刻での再実行時は、読み込みからグラフ作成までをキャッシュから返す.
+
+    Args:
+        csv_path: CSVファイルのパス
+        signature: キャッシュキーとするファイルの識別情報 (file_signature の値)
+        period: フィルタ期間
+        channel_id: グラフタイトルに表示するチャンネルID
+        reference_time: 期間の終端とする基準時刻 (get_reference_time の値)
+
+    Returns:
+        Plotly Figure オブジェクト
+    """
+    data = precomputed_slices(csv_path, signature, reference_time)[period]
+    return create_graph(data, channel_id)
+
+
+@st.fragment
+def render_channel(csv_path: Path, period: str) -> None:
+    """1チャンネル分の指標とグラフを表示する.
+
+    フラグメントとして描画し、このブロック内の操作による再実行をこのチャンネルの表示だけに限定する.
+
+    Args:
+        csv_path: CSVファイルのパス
+        period: フィルタ期間
+    """
+    channel_id = csv_path.stem
+    signature = file_signature(csv_path)
+    reference_time = get_reference_time()
+
+    # データ読み込みと期間フィルタ適用 (全期間のスライスは読み込んだデータそのもの)
+    slices = precomputed_slices(csv_path, signature, reference_time)
+
+    if len(slices['全期間'].timestamp) == 0:
+        st.warning(f'{channel_id}: データが空')
+        return
+
+    data = slices[period]
+
+    if len(data.timestamp) == 0:
+        st.warning(f'{channel_id}: 選択期間内にデータがない')
+        return
+
+    # 最新値と変化量
+    st.header(f'チャンネル: {channel_id}')
+
+    changes = calculate_changes(csv_path, signature)
+
+    col1, col2, col3 = st.columns(3)
+
+    with col1:
+        st.metric(
+            label='登録者数',
+            value=f'{data.subscriber_count[-1]:,}',
+        )
+        st.caption(f'前日比: {format_change(changes["subscriber_count"].daily_change, changes["subscriber_count"].daily_rate)}')
+        st.caption(f'前週比: {format_change(changes["subscriber_count"].weekly_change, changes["subscriber_count"].weekly_rate)}')
+
+    with col2:
+        st.metric(
+            label='視聴回数',
+            value=f'{data.view_count[-1]:,}',
+        )
+        st.caption(f'前日比: {format_change(changes["view_count"].daily_change, changes["view_count"].daily_rate)}')
+        st.caption(f'前週比: {format_change(changes["view_count"].weekly_change, changes["view_count"].weekly_rate)}')
+
+    with col3:
+        st.metric(
+            label='動画数',
+            value=f'{data.video_count[-1]:,}',
+        )
+        st.caption(f'前日比: {format_change(changes["video_count"].daily_change, changes["video_count"].daily_rate)}')
+        st.caption(f'前週比: {format_change(changes["video_count"].weekly_change, changes["video_count"].weekly_rate)}')
+
+    # グラフ表示
+    fig = build_figure(csv_path, signature, period, channel_id, reference_time)
+    st.plotly_chart(fig, use_container_width=True)
+
+    st.divider()
+
+
 def main() -> None:
     """メイン処理を実行する."""
     st.title('📊 YouTube Channel Tracker')
@@ -273,62 +443,11 @@ def main() -> None:
     st.sidebar.header('フィルタ設定')
     period = st.sidebar.selectbox(
         '表示期間',
-        ['全期間', '過去7日', '過去30日', '過去90日'],
+        PERIOD_OPTIONS,
     )
 
     for csv_path in csv_files:
-        channel_id = csv_path.stem
-
-        # データ読み込み
-        raw_data = load_csv_data(csv_path)
-
-        if not raw_data.timestamp:
-            st.warning(f'{channel_id}: データが空')
-            continue
-
-        # 期間フィルタ適用
-        data = filter_data_by_period(raw_data, period)
-
-        if not data.timestamp:
-            st.warning(f'{channel_id}: 選択期間内にデータがない')
-            continue
-
-        # 最新値と変化量
-        st.header(f'チャンネル: {channel_id}')
-
-        changes = calculate_changes(raw_data)
-
-        col1, col2, col3 = st.columns(3)
-
-        with col1:
-            st.metric(
-                label='登録者数',
-                value=f'{data.subscriber_count[-1]:,}',
-            )
-            st.caption(f'前日比: {format_change(changes["subscriber_count"].daily_change, changes["subscriber_count"].daily_rate)}')
-            st.caption(f'前週比: {format_change(changes["subscriber_count"].weekly_change, changes["subscriber_count"].weekly_rate)}')
-
-        with col2:
-            st.metric(
-                label='視聴回数',
-                value=f'{data.view_count[-1]:,}',
-            )
-            st.caption(f'前日比: {format_change(changes["view_count"].daily_change, changes["view_count"].daily_rate)}')
-            st.caption(f'前週比: {format_change(changes["view_count"].weekly_change, changes["view_count"].weekly_rate)}')
-
-        with col3:
-            st.metric(
-                label='動画数',
-                value=f'{data.video_count[-1]:,}',
-            )
-            st.caption(f'前日比: {format_change(changes["video_count"].daily_change, changes["video_count"].daily_rate)}')
-            st.caption(f'前週比: {format_change(changes["video_count"].weekly_change, changes["video_count"].weekly_rate)}')
-
-        # グラフ表示
-        fig = create_graph(data, channel_id)
-        st.plotly_chart(fig, use_container_width=True)
-
-        st.divider()
+        render_channel(csv_path, period)
 
 
 if __name__ == '__main__':
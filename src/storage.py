@@ -0,0 +1,129 @@
+"""統計データファイルの読み書きを行うモジュール.
+
+CSVファイルを正本とし、読み込み高速化用の同名のParquetファイルは読み込み時にローカルで生成する (git管理外).
+"""
+
+import hashlib
+import os
+import tempfile
+from pathlib import Path
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pa_csv
+import pyarrow.parquet as pq
+
+CSV_DTYPES = {
+    'subscriber_count': 'int64',
+    'view_count': 'int64',
+    'video_count': 'int64',
+}
+
+DATA_COLUMNS = ['timestamp', 'subscriber_count', 'view_count', 'video_count']
+
+PARQUET_COLUMN_TYPES = {
+    'timestamp': pa.timestamp('s'),
+    'subscriber_count': pa.int64(),
+    'view_count': pa.int64(),
+    'video_count': pa.int64(),
+}
+
+# Parquetのスキーマメタデータに記録する、変換元CSVの内容ハッシュのキー
+SOURCE_CSV_DIGEST_KEY = b'source_csv_blake2b'
+
+
+def csv_digest(csv_path: Path) -> bytes:
+    """CSVファイルの内容ハッシュを計算する.
+
+    Args:
+        csv_path: CSVファイルのパス
+
+    Returns:
+        CSVファイルの内容の BLAKE2b ハッシュ (16進文字列のバイト列)
+    """
+    return hashlib.blake2b(csv_path.read_bytes()).hexdigest().encode()
+
+
+def write_parquet(csv_path: Path) -> Path:
+    """CSVファイルと同じ内容のParquetファイル (Snappy圧縮) を書き出す.
+
+    鮮度の判定に使うため、変換元CSVの内容ハッシュをスキーマメタデータに記録する.
+    書き込み途中のファイルが読まれないよう、一時ファイルに書き出してから置き換える.
+
+    Args:
+        csv_path: 変換対象のCSVファイルのパス
+
+    Returns:
+        書き出したParquetファイルのパス
+    """
+    digest = csv_digest(csv_path)
+    convert_options = pa_csv.ConvertOptions(column_types=PARQUET_COLUMN_TYPES)
+    table = pa_csv.read_csv(csv_path, convert_options=convert_options)
+    table = table.replace_schema_metadata({**(table.schema.metadata or {}), SOURCE_CSV_DIGEST_KEY: digest})
+
+    parquet_path = csv_path.with_suffix('.parquet')
+    # 複数のプロセスが同時に作り直しても衝突しないよう、一時ファイル名は書き込みごとに一意にする
+    fd, tmp_name = tempfile.mkstemp(suffix='.parquet.tmp', dir=parquet_path.parent)
+    os.close(fd)
+    try:
+        pq.write_table(table, tmp_name, compression='snappy')
+        os.replace(tmp_name, parquet_path)
+    except BaseException:
+        Path(tmp_name).unlink(missing_ok=True)
+        raise
+    return parquet_path
+
+
+def is_parquet_fresh(csv_path: Path, parquet_path: Path) -> bool:
+    """ParquetファイルがCSVファイルの現在の内容から作られたものか判定する.
+
+    更新時刻はgitのチェックアウトで書き換わり、サイズは同じ長さの修正を見逃すため、記録された変換元CSVの内容ハッシュと比較する.
+
+    Args:
+        csv_path: CSVファイルのパス
+        parquet_path: Parquetファイルのパス
+
+    Returns:
+        Parquetファイルが存在して読み込め、CSVファイルと内容が一致するとみなせる場合は True
+    """
+    if not parquet_path.exists():
+        return False
+
+    try:
+        metadata = pq.read_schema(parquet_path).metadata or {}
+    except (OSError, pa.ArrowException):
+        return False
+    return metadata.get(SOURCE_CSV_DIGEST_KEY) == csv_digest(csv_path)
+
+
+def load_stats_frame(csv_path: Path) -> pd.DataFrame:
+    """統計データをDataFrameとして読み込む.
+
+    同名のParquetファイルがCSVファイルと一致していればそちらを列指定で読み込む.
+    一致しない場合はCSVファイルからParquetファイルを作り直して読み込み、
+    作り直せない場合やParquetファイルが壊れている場合はCSVファイルを読み込む.
+
+    Args:
+        csv_path: CSVファイルのパス
+
+    Returns:
+        各カラムのデータを格納したDataFrame
+    """
+    parquet_path = csv_path.with_suffix('.parquet')
+    if is_parquet_fresh(csv_path, parquet_path):
+        try:
+            return pd.read_parquet(parquet_path, columns=DATA_COLUMNS)
+        except (OSError, pa.ArrowException):
+            pass
+
+    try:
+        write_parquet(csv_path)
+        return pd.read_parquet(parquet_path, columns=DATA_COLUMNS)
+    except (OSError, pa.ArrowException):
+        return pd.read_csv(
+            csv_path,
+            encoding='utf-8',
+            dtype=CSV_DTYPES,
+            parse_dates=['timestamp'],
+            date_format='%Y-%m-%d %H:%M:%S',
+        )